@@ -2,62 +2,290 @@
 # A Python system to periodically invest in an index fund by tracking its composition
 # Operating at weekly frequency
 
+import numpy as np
 import pandas as pd
 import yfinance as yf
+from yfinance.exceptions import YFException
 import time
 import schedule
 import datetime
 import logging
+import logging.handlers
+import queue
+import atexit
+import itertools
+import types
+import functools
+import os
+import json
+import tempfile
+import asyncio
+import aiohttp
+import io
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Set up logging
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Set up logging; records are queued and written by a background thread so
+# file I/O stays off the rebalance path
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler("index_investor.log"),
+    logging.StreamHandler()
+)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("index_investor.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger("IndexInvestor")
 
+# On-disk cache for slowly changing data (index constituents)
+CACHE_DIR = os.path.expanduser("~/.idxfund_cache")
+CONSTITUENTS_TTL = 7 * 24 * 3600  # seconds
+MARKET_CAP_TTL = 24 * 3600        # seconds
+PRICE_TTL = 300                   # seconds
+MAX_SCHEDULER_SLEEP = 3600        # seconds
+
+# Yahoo quote endpoint, queried directly for bulk price/market cap lookups.
+# Off by default: the endpoint rejects requests without a session crumb, so
+# only enable it behind a proxy or client that supplies one
+USE_QUOTE_ENDPOINT = False
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+QUOTE_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Shared HTTP session so TCP/TLS connections are reused across requests
+_SESSION = requests.Session()
+_SESSION.headers.update(QUOTE_HEADERS)
+_SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
 ###########################################
 # SECTION 1: DATA RETRIEVAL
 ###########################################
 
-def get_index_composition(index_symbol):
+async def _fetch_quote_chunk(session, chunk):
+    """Fetch quotes for one group of symbols."""
+    async with session.get(QUOTE_URL, params={'symbols': ','.join(chunk)}) as response:
+        response.raise_for_status()
+        return await response.json()
+
+async def _fetch_quotes_async(symbols, chunk_size, max_connections):
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    connector = aiohttp.TCPConnector(limit=max_connections)
+    async with aiohttp.ClientSession(connector=connector, headers=QUOTE_HEADERS) as session:
+        # Probe with the first chunk; if the endpoint rejects us (e.g. it wants a
+        # session crumb) skip the rest and let callers fall back to yfinance
+        try:
+            responses = [await _fetch_quote_chunk(session, chunks[0])]
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug(f"Quote endpoint unavailable, skipping {len(symbols)} symbols: {e}")
+            return {}
+        responses += await asyncio.gather(*[_fetch_quote_chunk(session, c) for c in chunks[1:]],
+                                          return_exceptions=True)
+    
+    quotes = {}
+    failed = 0
+    for response in responses:
+        if isinstance(response, Exception):
+            failed += 1
+            continue
+        for quote in (response.get('quoteResponse') or {}).get('result') or []:
+            quotes[quote['symbol']] = quote
+    if failed:
+        logger.debug(f"{failed} of {len(chunks)} quote requests failed")
+    return quotes
+
+def fetch_quotes(symbols, chunk_size=20, max_connections=100):
+    """
+    Fetch Yahoo quotes for many symbols concurrently.
+    
+    Args:
+        symbols: Symbols to look up
+        chunk_size: Symbols per request (Yahoo accepts ~20)
+        max_connections: Maximum number of concurrent connections
+        
+    Returns:
+        Dictionary of symbol -> quote fields (e.g. 'regularMarketPrice', 'marketCap')
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_fetch_quotes_async(symbols, chunk_size, max_connections))
+    
+    # Called from inside an event loop; run ours on a separate thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(
+            lambda: asyncio.run(_fetch_quotes_async(symbols, chunk_size, max_connections))).result()
+
+_mcap_cache = {}  # symbol -> (fetched_at, market_cap)
+
+def _prime_mcap_cache(symbols):
+    """Fill the market cap cache for stale symbols with one batch of quote requests."""
+    if not USE_QUOTE_ENDPOINT:
+        return
+    now = time.time()
+    stale = [s for s in symbols if s not in _mcap_cache or now - _mcap_cache[s][0] >= MARKET_CAP_TTL]
+    for symbol, quote in fetch_quotes(stale).items():
+        if quote.get('marketCap'):
+            _mcap_cache[symbol] = (now, quote['marketCap'])
+
+def _fetch_mcap(symbol):
+    """Fetch the market cap for a single symbol (0 if unavailable); known values are cached for a day."""
+    cached = _mcap_cache.get(symbol)
+    if cached and time.time() - cached[0] < MARKET_CAP_TTL:
+        return symbol, cached[1]
+    market_cap = yf.Ticker(symbol, session=_SESSION).info.get('marketCap', 0) or 0
+    # Don't cache misses, so one empty response doesn't pin the weight at 0 all day
+    if market_cap:
+        _mcap_cache[symbol] = (time.time(), market_cap)
+    return symbol, market_cap
+
+def _scrape_constituents(url, xpath, column, min_count):
+    """
+    Scrape constituent symbols from a Wikipedia table.
+    
+    Args:
+        url: Page listing the index constituents
+        xpath: Query selecting the symbol cells' text
+        column: Symbol column header, used by the fallback parse
+        min_count: Fewer matches than this means the page layout changed
+    """
+    response = _SESSION.get(url)
+    response.raise_for_status()
+    
+    # Pull the symbol column straight out of the constituents table
+    tree = html.fromstring(response.content)
+    symbols = [s for s in (text.strip() for text in tree.xpath(xpath)) if s]
+    
+    # Too few matches means the page layout changed; fall back to a full parse
+    if len(symbols) < min_count:
+        tables = pd.read_html(io.StringIO(response.text))
+        table = next((t for t in tables if column in t.columns), None)
+        if table is None:
+            raise ValueError(f"No table with a '{column}' column found at {url}")
+        symbols = table[column].tolist()
+    return symbols
+
+def _cached_constituents(index_symbol, as_of, fetch):
+    """
+    Load constituent symbols persisted on disk within the last week,
+    otherwise call `fetch()` and persist its result.
+    The cache is best-effort: unreadable entries count as misses and
+    failed writes are only logged.
+    """
+    path = os.path.join(CACHE_DIR, f"{index_symbol.lstrip('^')}_{as_of[:7].replace('-', '')}.json")
+    try:
+        if time.time() - os.path.getmtime(path) < CONSTITUENTS_TTL:
+            with open(path) as f:
+                return json.load(f)
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable constituents cache {path}: {e}")
+    
+    symbols = fetch()
+    
+    # Write to a temp file and move it into place so readers never see a partial file
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(symbols, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"Could not write constituents cache {path}: {e}")
+    return symbols
+
+def _market_cap_composition(symbols, max_workers):
+    """Weight `symbols` by market cap."""
+    # Get market caps to approximate weights; symbols missing from the
+    # bulk quote response fall back to per-symbol lookups
+    _prime_mcap_cache(symbols)
+    market_caps = {symbol: 0 for symbol in symbols}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fetch_mcap, s): s for s in symbols}
+        for future in as_completed(futures):
+            try:
+                symbol, market_cap = future.result()
+                market_caps[symbol] = market_cap
+            except (requests.RequestException, YFException, KeyError, ValueError) as e:
+                logger.warning(f"Could not fetch market cap for {futures[future]}: {e}")
+    
+    # Calculate weights
+    syms = list(market_caps)
+    caps = np.fromiter((market_caps[s] for s in syms), dtype=np.float64, count=len(syms))
+    total_mcap = caps.sum()
+    if total_mcap <= 0:
+        raise ValueError("No market caps available to weight the index")
+    weights = dict(zip(syms, (caps / total_mcap).tolist()))
+    
+    return {'symbols': symbols, 'weights': weights}
+
+@functools.lru_cache(maxsize=4)
+def _get_gspc_symbols(as_of):
+    """S&P 500 constituents; `as_of` (an ISO date) rolls the in-memory cache over daily."""
+    return _cached_constituents("^GSPC", as_of, lambda: _scrape_constituents(
+        'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies',
+        '//table[@id="constituents"]//tr/td[1]/a/text()', 'Symbol', 400))
+
+@functools.lru_cache(maxsize=4)
+def _get_ndx_symbols(as_of):
+    """Nasdaq-100 constituents; `as_of` (an ISO date) rolls the in-memory cache over daily."""
+    return _cached_constituents("^NDX", as_of, lambda: _scrape_constituents(
+        'https://en.wikipedia.org/wiki/Nasdaq-100',
+        '//table[@id="constituents"]//tr/td[1]/text()', 'Ticker', 90))
+
+def _get_gspc_composition(max_workers=16):
+    """S&P 500 composition, approximated by market cap."""
+    # In reality, you would need a data provider for accurate composition data
+    # This is placeholder code
+    symbols = list(_get_gspc_symbols(datetime.date.today().isoformat()))
+    return _market_cap_composition(symbols, max_workers)
+
+def _get_ndx_composition(max_workers=16):
+    """Nasdaq-100 composition, approximated by market cap."""
+    symbols = list(_get_ndx_symbols(datetime.date.today().isoformat()))
+    return _market_cap_composition(symbols, max_workers)
+
+# Index symbol -> composition handler
+_INDEX_HANDLERS = {
+    "^GSPC": _get_gspc_composition,  # S&P 500
+    "^NDX": _get_ndx_composition,    # Nasdaq-100
+}
+
+def get_index_composition(index_symbol, max_workers=16):
     """
     Retrieves the composition of an index and its current weights.
     For some indices, you might need specialized data sources.
     
     Args:
         index_symbol: The symbol of the index (e.g., "^GSPC" for S&P 500)
+        max_workers: Number of threads used to fetch market caps concurrently
         
     Returns:
         Dictionary with symbols and their weights in the index
     """
-    # This is a simplified example - actual implementation depends on your data source
-    if index_symbol == "^GSPC":  # S&P 500
-        # In reality, you would need a data provider for accurate composition data
-        # This is placeholder code
-        sp500 = pd.read_html('https://en.wikipedia.org/wiki/List_of_S%26P_500_companies')[0]
-        symbols = sp500['Symbol'].tolist()
-        
-        # Get market caps to approximate weights
-        market_caps = {}
-        for symbol in symbols:
-            try:
-                stock = yf.Ticker(symbol)
-                market_caps[symbol] = stock.info.get('marketCap', 0)
-            except:
-                market_caps[symbol] = 0
-        
-        # Calculate weights
-        total_mcap = sum(market_caps.values())
-        weights = {symbol: market_caps[symbol]/total_mcap for symbol in market_caps}
-        
-        return {'symbols': symbols, 'weights': weights}
-    else:
-        raise ValueError(f"Index {index_symbol} not supported")
+    try:
+        handler = _INDEX_HANDLERS[index_symbol]
+    except KeyError:
+        raise ValueError(f"Index {index_symbol} not supported") from None
+    return handler(max_workers=max_workers)
 
 ###########################################
 # SECTION 2: PORTFOLIO MANAGEMENT
@@ -69,30 +297,125 @@ class IndexPortfolio:
     This is essential for determining what trades to make to match the index.
     """
     
+    __slots__ = ('cash', '_symbols', '_sym_to_idx', '_qty', '_px', '_px_time')
+    
     def __init__(self, initial_cash=0):
         self.cash = initial_cash
-        self.holdings = {}  # symbol -> quantity
-        self.prices = {}    # symbol -> current price
+        # Holdings and prices are stored as aligned arrays indexed by symbol slot;
+        # a price of 0 means the symbol has not been priced yet
+        self._symbols = []     # slot -> symbol
+        self._sym_to_idx = {}  # symbol -> slot
+        self._qty = np.zeros(0, dtype=np.int64)
+        self._px = np.zeros(0, dtype=np.float64)
+        self._px_time = np.zeros(0, dtype=np.float64)  # when each price was fetched
+    
+    @property
+    def holdings(self):
+        """Read-only view of symbol -> quantity for non-zero positions; use adjust_holding to change."""
+        n = len(self._symbols)
+        return types.MappingProxyType(
+            {s: q for s, q in zip(self._symbols, self._qty[:n].tolist()) if q != 0})
+    
+    @property
+    def prices(self):
+        """Read-only view of symbol -> current price for priced symbols; use set_price to change."""
+        n = len(self._symbols)
+        return types.MappingProxyType(
+            {s: p for s, p in zip(self._symbols, self._px[:n].tolist()) if p > 0})
+    
+    def _index_of(self, symbol):
+        """Return the array slot for a symbol, growing the arrays if it is new."""
+        idx = self._sym_to_idx.get(symbol)
+        if idx is None:
+            idx = len(self._symbols)
+            if idx == self._qty.size:
+                capacity = max(2 * idx, 16)
+                self._qty = np.resize(self._qty, capacity)
+                self._px = np.resize(self._px, capacity)
+                self._px_time = np.resize(self._px_time, capacity)
+                self._qty[idx:] = 0
+                self._px[idx:] = 0
+                self._px_time[idx:] = 0
+            self._sym_to_idx[symbol] = idx
+            self._symbols.append(symbol)
+        return idx
+    
+    def get_price(self, symbol):
+        """Current price of a symbol (0 if unknown)."""
+        idx = self._sym_to_idx.get(symbol)
+        return 0.0 if idx is None else float(self._px[idx])
+    
+    def set_price(self, symbol, price):
+        """Record the current price of a symbol."""
+        idx = self._index_of(symbol)
+        self._px[idx] = price
+        self._px_time[idx] = time.time()
+    
+    def get_slots(self, symbols):
+        """
+        Array slots for `symbols`, registering any that are new.
+        Slots are stable, so the result can be reused across rebalances.
+        """
+        return np.fromiter((self._index_of(s) for s in symbols), dtype=np.int64, count=len(symbols))
+    
+    def get_positions(self, slots):
+        """Quantities and prices at the given slots (see get_slots)."""
+        return self._qty[slots], self._px[slots]
+    
+    def adjust_holding(self, symbol, quantity):
+        """Add (or, if negative, remove) shares of a symbol."""
+        # Resolve the slot first: _index_of may replace self._qty when growing
+        idx = self._index_of(symbol)
+        self._qty[idx] += quantity
         
     def deposit(self, amount):
         """Add cash to the portfolio."""
         self.cash += amount
         
-    def update_prices(self, symbols=None):
-        """Update current market prices."""
+    def update_prices(self, symbols=None, chunk_size=20, max_age=PRICE_TTL):
+        """
+        Update current market prices from concurrent bulk quote requests.
+        Prices fetched less than `max_age` seconds ago are kept as-is.
+        """
         symbols = symbols or list(self.holdings.keys())
+        now = time.time()
+        symbols = [s for s in symbols
+                   if s not in self._sym_to_idx or now - self._px_time[self._sym_to_idx[s]] > max_age]
+        if not symbols:
+            return
+        quotes = fetch_quotes(symbols, chunk_size) if USE_QUOTE_ENDPOINT else {}
+        
+        missing = []
         for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                self.prices[symbol] = ticker.history(period='1d')['Close'].iloc[-1]
-            except:
-                print(f"Could not update price for {symbol}")
+            price = quotes.get(symbol, {}).get('regularMarketPrice')
+            if price:
+                self.set_price(symbol, float(price))
+            else:
+                missing.append(symbol)
+        
+        if missing:
+            self._download_prices(missing, chunk_size)
+    
+    def _download_prices(self, symbols, chunk_size=20):
+        """Fall back to batched yfinance downloads for symbols without a quote."""
+        it = iter(symbols)
+        for chunk in iter(lambda: list(itertools.islice(it, chunk_size)), []):
+            data = yf.download(" ".join(chunk), period='1d', group_by='ticker',
+                               threads=True, progress=False, session=_SESSION)
+            for symbol in chunk:
+                try:
+                    # Single-symbol downloads may come back with flat columns
+                    if isinstance(data.columns, pd.MultiIndex):
+                        closes = data[symbol]['Close']
+                    else:
+                        closes = data['Close']
+                    self.set_price(symbol, float(closes.dropna().iloc[-1]))
+                except (KeyError, IndexError):
+                    logger.warning(f"Could not update price for {symbol}")
     
     def get_total_value(self):
         """Calculate total portfolio value."""
-        holdings_value = sum(self.holdings.get(s, 0) * self.prices.get(s, 0) 
-                            for s in self.holdings)
-        return holdings_value + self.cash
+        return float(self._qty @ self._px) + self.cash
     
     def get_current_weights(self):
         """Calculate current portfolio weights."""
@@ -100,10 +423,11 @@ class IndexPortfolio:
         if total == 0:
             return {}
         
-        weights = {}
-        for symbol, quantity in self.holdings.items():
-            if symbol in self.prices:
-                weights[symbol] = (quantity * self.prices[symbol]) / total
+        n = len(self._symbols)
+        qty, px = self._qty[:n], self._px[:n]
+        held = (qty != 0) & (px > 0)
+        w = qty * px / total
+        weights = {s: wi for s, wi, h in zip(self._symbols, w.tolist(), held.tolist()) if h}
         
         # Include cash weight
         weights['CASH'] = self.cash / total
@@ -113,54 +437,69 @@ class IndexPortfolio:
 # SECTION 3: ORDER GENERATION
 ###########################################
 
-def generate_orders(portfolio, target_weights, min_order_value=10):
+@njit
+def _compute_orders(tw, qty, px, total_value, min_order_value, available_cash):
+    """
+    Numeric kernel for generate_orders over arrays aligned by symbol.
+    Returns signed whole-share quantities (positive = buy, negative = sell).
+    """
+    n = tw.size
+    q = np.zeros(n, np.int64)
+    for i in range(n):
+        value_difference = total_value * tw[i] - qty[i] * px[i]
+        
+        # Skip invalid or small adjustments and symbols without a usable price
+        if not np.isfinite(value_difference) or abs(value_difference) < min_order_value or px[i] <= 0:
+            continue
+        
+        # Whole shares only; truncation keeps the sign of value_difference
+        quantity = int(value_difference / px[i])
+        
+        if quantity > 0:  # Buy
+            order_value = quantity * px[i]
+            if order_value <= available_cash:
+                q[i] = quantity
+                available_cash -= order_value
+        else:  # Sell (or zero, which is a no-op)
+            q[i] = quantity
+    return q
+
+@functools.lru_cache(maxsize=1)
+def _warm_up_kernels():
+    """Compile the order kernel once so the first rebalance doesn't pay the JIT cost."""
+    _compute_orders(np.zeros(1), np.zeros(1, dtype=np.int64), np.zeros(1), 0.0, 0.0, 0.0)
+
+def generate_orders(portfolio, target_syms, target_w, min_order_value=10, skip_update=False,
+                    target_slots=None):
     """
     Generate buy/sell orders to rebalance the portfolio.
     
     Args:
         portfolio: The IndexPortfolio object
-        target_weights: Dictionary of symbol -> target weight
+        target_syms: Array of target symbols
+        target_w: Array of target weights aligned with target_syms
         min_order_value: Minimum order value to avoid tiny orders
+        skip_update: Use the portfolio's current prices instead of refreshing them
+        target_slots: Precomputed portfolio.get_slots(target_syms), if available
         
     Returns:
         List of (symbol, quantity, action) tuples
     """
-    portfolio.update_prices(list(target_weights.keys()))
+    symbols = list(target_syms)
+    if not skip_update:
+        portfolio.update_prices(symbols)
+    if target_slots is None:
+        target_slots = portfolio.get_slots(symbols)
     total_value = portfolio.get_total_value()
-    current_weights = portfolio.get_current_weights()
-    
-    orders = []
-    available_cash = portfolio.cash
+    qty, px = portfolio.get_positions(target_slots)
     
-    # Calculate target value for each position
-    for symbol, target_weight in target_weights.items():
-        target_value = total_value * target_weight
-        current_value = 0
-        
-        if symbol in portfolio.holdings and symbol in portfolio.prices:
-            current_value = portfolio.holdings[symbol] * portfolio.prices[symbol]
-        
-        value_difference = target_value - current_value
-        
-        # Skip small adjustments
-        if abs(value_difference) < min_order_value:
-            continue
-            
-        # Calculate quantity based on current price
-        if symbol in portfolio.prices and portfolio.prices[symbol] > 0:
-            price = portfolio.prices[symbol]
-            quantity = int(value_difference / price)  # Whole shares only
-            
-            if quantity > 0 and value_difference > 0:  # Buy
-                order_value = quantity * price
-                if order_value <= available_cash:
-                    orders.append((symbol, quantity, "BUY"))
-                    available_cash -= order_value
-                    
-            elif quantity < 0 and value_difference < 0:  # Sell
-                orders.append((symbol, abs(quantity), "SELL"))
+    q = _compute_orders(np.asarray(target_w, dtype=np.float64), qty, px, float(total_value),
+                        float(min_order_value), float(portfolio.cash))
     
-    return orders
+    nonzero = np.flatnonzero(q)
+    actions = np.where(q[nonzero] > 0, "BUY", "SELL")
+    return [(symbols[i], quantity, action) for i, quantity, action
+            in zip(nonzero.tolist(), np.abs(q[nonzero]).tolist(), actions.tolist())]
 
 ###########################################
 # SECTION 4: EXECUTION
@@ -172,6 +511,8 @@ class BrokerInterface:
     In a real implementation, this would connect to your broker's API.
     """
     
+    __slots__ = ('paper_trading', 'api_key', 'api_secret', 'api')
+    
     def __init__(self, api_key=None, api_secret=None, paper_trading=True):
         self.paper_trading = paper_trading
         self.api_key = api_key
@@ -206,6 +547,14 @@ class BrokerInterface:
                 print(f"Error placing order: {e}")
                 return False
     
+    async def place_order_async(self, symbol, quantity, side):
+        """
+        Place an order without blocking the event loop.
+        Broker SDKs such as Alpaca's REST client are synchronous, so the call
+        runs in a worker thread.
+        """
+        return await asyncio.to_thread(self.place_order, symbol, quantity, side)
+    
     def get_account_info(self):
         """Get account information from broker."""
         if self.paper_trading:
@@ -224,16 +573,30 @@ class IndexInvestor:
     Main class that integrates all components of the system.
     """
     
+    __slots__ = ('index_symbol', 'broker', 'portfolio', 'latest_composition',
+                 '_target_syms', '_target_w', '_target_slots')
+    
     def __init__(self, index_symbol, broker_interface, initial_cash=0):
         self.index_symbol = index_symbol
         self.broker = broker_interface
         self.portfolio = IndexPortfolio(initial_cash)
         self.latest_composition = None
+        # Target weights as sorted symbol / weight arrays, plus their portfolio slots
+        self._target_syms = None
+        self._target_w = None
+        self._target_slots = None
+        _warm_up_kernels()
         
     def update_index_composition(self):
         """Fetch latest index composition."""
         try:
             self.latest_composition = get_index_composition(self.index_symbol)
+            
+            weights = self.latest_composition['weights']
+            self._target_syms = np.array(sorted(weights))
+            self._target_w = np.array([weights[s] for s in self._target_syms], dtype=np.float64)
+            self._target_slots = self.portfolio.get_slots(self._target_syms.tolist())
+            
             logger.info(f"Updated index composition with {len(self.latest_composition['symbols'])} symbols")
             return True
         except Exception as e:
@@ -247,27 +610,45 @@ class IndexInvestor:
                 logger.error("Cannot rebalance without index composition")
                 return
         
-        # Generate orders
-        orders = generate_orders(self.portfolio, self.latest_composition['weights'])
+        # Refresh prices once, then generate orders against them
+        target_syms = self._target_syms.tolist()
+        self.portfolio.update_prices(target_syms)
+        orders = generate_orders(self.portfolio, target_syms, self._target_w,
+                                 skip_update=True, target_slots=self._target_slots)
         
         # Execute orders
+        orders = [order for order in orders if order[1] > 0]  # Skip zero-quantity orders
         successful_orders = []
-        for symbol, quantity, action in orders:
-            if quantity > 0:  # Skip zero-quantity orders
-                success = self.broker.place_order(symbol, quantity, action)
-                if success:
-                    successful_orders.append((symbol, quantity, action))
-                    
-                    # Update portfolio (in a real system, you'd confirm execution first)
-                    if action == "BUY":
-                        self.portfolio.holdings[symbol] = self.portfolio.holdings.get(symbol, 0) + quantity
-                        self.portfolio.cash -= quantity * self.portfolio.prices[symbol]
-                    else:  # SELL
-                        self.portfolio.holdings[symbol] = self.portfolio.holdings.get(symbol, 0) - quantity
-                        self.portfolio.cash += quantity * self.portfolio.prices[symbol]
+        for (symbol, quantity, action), success in self._submit_orders(orders):
+            if success:
+                successful_orders.append((symbol, quantity, action))
+                
+                # Update portfolio (in a real system, you'd confirm execution first)
+                if action == "BUY":
+                    self.portfolio.adjust_holding(symbol, quantity)
+                    self.portfolio.cash -= quantity * self.portfolio.get_price(symbol)
+                else:  # SELL
+                    self.portfolio.adjust_holding(symbol, -quantity)
+                    self.portfolio.cash += quantity * self.portfolio.get_price(symbol)
         
         logger.info(f"Rebalancing complete. Executed {len(successful_orders)} orders.")
         
+    def _submit_orders(self, orders, max_concurrency=10):
+        """
+        Submit orders concurrently, limited to `max_concurrency` in flight.
+        Sells are submitted before buys so they free up cash first.
+        
+        Returns:
+            List of ((symbol, quantity, action), success) pairs
+        """
+        results = []
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for side in ("SELL", "BUY"):
+                batch = [order for order in orders if order[2] == side]
+                successes = list(executor.map(lambda order: self.broker.place_order(*order), batch))
+                results.extend(zip(batch, successes))
+        return results
+        
     def deposit_funds(self, amount):
         """Add funds to the portfolio."""
         self.portfolio.deposit(amount)
@@ -282,26 +663,20 @@ class IndexInvestor:
         day_name = days[day_of_week]
         
         # Set up the schedule based on the day of week
-        if day_of_week == 0:
-            schedule.every().monday.at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
-        elif day_of_week == 1:
-            schedule.every().tuesday.at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
-        elif day_of_week == 2:
-            schedule.every().wednesday.at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
-        elif day_of_week == 3:
-            schedule.every().thursday.at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
-        elif day_of_week == 4:
-            schedule.every().friday.at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
-        elif day_of_week == 5:
-            schedule.every().saturday.at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
-        elif day_of_week == 6:
-            schedule.every().sunday.at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
+        getattr(schedule.every(), day_name.lower()).at(f"{hour:02d}:{minute:02d}").do(self.rebalance)
         
         logger.info(f"Scheduled weekly rebalancing for {day_name} at {hour:02d}:{minute:02d}")
         
+        # Sleep until the next scheduled run instead of polling every minute.
+        # Each sleep is capped so suspend or clock changes are caught within
+        # MAX_SCHEDULER_SLEEP of the scheduled time
         while True:
+            idle = schedule.idle_seconds()
+            if idle is None:  # No jobs left
+                break
+            if idle > 0:
+                time.sleep(min(idle, MAX_SCHEDULER_SLEEP))
             schedule.run_pending()
-            time.sleep(60)  # Check every minute
 
 ###########################################
 # EXAMPLE USAGE
@@ -0,0 +1,275 @@
+import importlib.util
+import os
+
+import pytest
+
+CODE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code.py")
+
+CONSTITUENTS_PAGE = b"""
+<html><body>
+<table id="constituents">
+  <tr><th>Symbol</th><th>Security</th></tr>
+  <tr><td><a href="#">MMM</a></td><td>3M</td></tr>
+  <tr><td><a href="#">AOS</a></td><td>A. O. Smith</td></tr>
+  <tr><td><a href="#"> ABT </a></td><td>Abbott</td></tr>
+</table>
+</body></html>
+"""
+
+
+@pytest.fixture
+def idx(tmp_path, monkeypatch):
+    # code.py shadows the stdlib `code` module, so load it by path;
+    # run from tmp_path so the log file is written there
+    monkeypatch.chdir(tmp_path)
+    spec = importlib.util.spec_from_file_location("idxfund_code", CODE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.text = content.decode()
+
+    def raise_for_status(self):
+        pass
+
+
+def test_scrape_constituents_xpath(idx, monkeypatch):
+    monkeypatch.setattr(idx._SESSION, "get", lambda url: FakeResponse(CONSTITUENTS_PAGE))
+    symbols = idx._scrape_constituents(
+        "https://example.com", '//table[@id="constituents"]//tr/td[1]/a/text()', "Symbol", 3)
+    assert symbols == ["MMM", "AOS", "ABT"]
+
+
+def test_adjust_holding_grows_arrays(idx):
+    portfolio = idx.IndexPortfolio()
+    for i in range(20):
+        portfolio.adjust_holding(f"S{i}", i + 1)
+        portfolio.set_price(f"S{i}", 10.0)
+    assert portfolio.holdings["S0"] == 1
+    assert portfolio.holdings["S16"] == 17
+    assert portfolio.get_total_value() == 10.0 * sum(range(1, 21))
+
+
+def test_market_cap_failures_are_skipped(idx, monkeypatch):
+    from yfinance.exceptions import YFRateLimitError
+
+    def fake_fetch_mcap(symbol):
+        if symbol == "B":
+            raise YFRateLimitError()
+        return symbol, 100
+
+    monkeypatch.setattr(idx, "_prime_mcap_cache", lambda symbols: None)
+    monkeypatch.setattr(idx, "_fetch_mcap", fake_fetch_mcap)
+    composition = idx._market_cap_composition(["A", "B", "C"], max_workers=2)
+    assert composition["weights"] == {"A": 0.5, "B": 0.0, "C": 0.5}
+
+
+def test_market_cap_composition_requires_market_caps(idx, monkeypatch):
+    monkeypatch.setattr(idx, "_prime_mcap_cache", lambda symbols: None)
+    monkeypatch.setattr(idx, "_fetch_mcap", lambda symbol: (symbol, 0))
+    with pytest.raises(ValueError):
+        idx._market_cap_composition(["A", "B"], max_workers=2)
+
+
+def test_generate_orders_skips_non_finite_weights(idx):
+    portfolio = idx.IndexPortfolio(initial_cash=1000)
+    portfolio.set_price("A", 10.0)
+    portfolio.set_price("B", 10.0)
+    orders = idx.generate_orders(portfolio, ["A", "B"], [float("nan"), 0.5], skip_update=True)
+    assert orders == [("B", 50, "BUY")]
+
+
+def test_fetch_quotes_stops_after_rejected_probe(idx, monkeypatch):
+    import aiohttp
+
+    calls = []
+
+    async def rejected(session, chunk):
+        calls.append(chunk)
+        raise aiohttp.ClientError("401 Unauthorized")
+
+    monkeypatch.setattr(idx, "_fetch_quote_chunk", rejected)
+    assert idx.fetch_quotes([f"S{i}" for i in range(100)]) == {}
+    assert len(calls) == 1
+
+
+def test_portfolio_views_are_read_only(idx):
+    portfolio = idx.IndexPortfolio()
+    with pytest.raises(TypeError):
+        portfolio.holdings["A"] = 1
+    with pytest.raises(TypeError):
+        portfolio.prices["A"] = 10.0
+
+
+def test_missing_market_cap_is_not_cached(idx, monkeypatch):
+    class FakeTicker:
+        def __init__(self, symbol, session=None):
+            self.info = {}
+
+    monkeypatch.setattr(idx.yf, "Ticker", FakeTicker)
+    assert idx._fetch_mcap("A") == ("A", 0)
+    assert "A" not in idx._mcap_cache
+
+
+def test_scrape_constituents_ignores_blank_cells(idx, monkeypatch):
+    page = CONSTITUENTS_PAGE.replace(b"<td>3M</td>", b"<td>3M</td></tr><tr><td>  </td><td>Blank</td>")
+    monkeypatch.setattr(idx._SESSION, "get", lambda url: FakeResponse(page))
+    symbols = idx._scrape_constituents(
+        "https://example.com", '//table[@id="constituents"]//tr/td[1]//text()', "Symbol", 3)
+    assert symbols == ["MMM", "AOS", "ABT"]
+
+
+def test_scrape_constituents_fallback_requires_column(idx, monkeypatch):
+    monkeypatch.setattr(idx._SESSION, "get", lambda url: FakeResponse(CONSTITUENTS_PAGE))
+    with pytest.raises(ValueError):
+        idx._scrape_constituents(
+            "https://example.com", '//table[@id="constituents"]//tr/td[1]//text()', "Ticker", 10)
+
+
+def test_constituents_cache_round_trip(idx, tmp_path, monkeypatch):
+    monkeypatch.setattr(idx, "CACHE_DIR", str(tmp_path / "cache"))
+    assert idx._cached_constituents("^GSPC", "2026-10-15", lambda: ["A", "B"]) == ["A", "B"]
+    assert idx._cached_constituents("^GSPC", "2026-10-15", lambda: pytest.fail("refetched")) == ["A", "B"]
+
+
+def test_corrupt_constituents_cache_is_a_miss(idx, tmp_path, monkeypatch):
+    monkeypatch.setattr(idx, "CACHE_DIR", str(tmp_path))
+    (tmp_path / "GSPC_202610.json").write_text('["A", "B')
+    assert idx._cached_constituents("^GSPC", "2026-10-15", lambda: ["A", "B"]) == ["A", "B"]
+    assert idx._cached_constituents("^GSPC", "2026-10-15", lambda: pytest.fail("refetched")) == ["A", "B"]
+
+
+def test_unwritable_constituents_cache_is_ignored(idx, tmp_path, monkeypatch):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    monkeypatch.setattr(idx, "CACHE_DIR", str(blocker / "cache"))
+    assert idx._cached_constituents("^GSPC", "2026-10-15", lambda: ["A"]) == ["A"]
+
+
+def test_run_weekly_caps_each_sleep(idx, monkeypatch):
+    idle = iter([7 * 24 * 3600, None])
+    sleeps = []
+    monkeypatch.setattr(idx.schedule, "idle_seconds", lambda: next(idle))
+    monkeypatch.setattr(idx.schedule, "run_pending", lambda: None)
+    monkeypatch.setattr(idx.time, "sleep", sleeps.append)
+    investor = idx.IndexInvestor("^GSPC", idx.BrokerInterface())
+    investor.run_weekly()
+    idx.schedule.clear()
+    assert sleeps == [idx.MAX_SCHEDULER_SLEEP]
+
+
+def test_rebalance_submits_sells_first_with_bounded_concurrency(idx, monkeypatch):
+    import threading
+    import time
+
+    class FakeBroker:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.submitted = []
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+        def place_order(self, symbol, quantity, side):
+            with self.lock:
+                self.submitted.append(side)
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(0.01)
+            with self.lock:
+                self.in_flight -= 1
+            return not symbol.startswith("FAIL")
+
+    orders = ([(f"S{i}", 1, "SELL") for i in range(15)]
+              + [(f"B{i}", 1, "BUY") for i in range(15)]
+              + [("FAILS", 1, "SELL"), ("FAILB", 1, "BUY")])
+    monkeypatch.setattr(idx.IndexPortfolio, "update_prices", lambda self, *a, **k: None)
+    monkeypatch.setattr(idx, "generate_orders", lambda *a, **k: orders)
+
+    broker = FakeBroker()
+    investor = idx.IndexInvestor("^GSPC", broker, initial_cash=1000)
+    investor.latest_composition = {"symbols": [], "weights": {}}
+    investor._target_syms = idx.np.array([])
+    for symbol, _, _ in orders:
+        investor.portfolio.set_price(symbol, 10.0)
+        investor.portfolio.adjust_holding(symbol, 5)
+
+    investor.rebalance()
+
+    assert broker.submitted == ["SELL"] * 16 + ["BUY"] * 16
+    assert broker.max_in_flight <= 10
+    assert investor.portfolio.holdings["FAILS"] == 5
+    assert investor.portfolio.holdings["FAILB"] == 5
+    assert investor.portfolio.holdings["S0"] == 4
+    assert investor.portfolio.holdings["B0"] == 6
+    assert investor.portfolio.cash == 1000
+
+
+def test_quote_endpoint_is_opt_in(idx, monkeypatch):
+    monkeypatch.setattr(idx, "fetch_quotes", lambda *a, **k: pytest.fail("quote endpoint used"))
+    downloaded = []
+    monkeypatch.setattr(idx.IndexPortfolio, "_download_prices",
+                        lambda self, symbols, chunk_size=20: downloaded.extend(symbols))
+    idx._prime_mcap_cache(["A"])
+    idx.IndexPortfolio().update_prices(["A"])
+    assert downloaded == ["A"]
+
+
+def test_fetch_quotes_inside_running_loop(idx, monkeypatch):
+    import asyncio
+
+    async def fake_chunk(session, chunk):
+        return {"quoteResponse": {"result": [{"symbol": s} for s in chunk]}}
+
+    monkeypatch.setattr(idx, "_fetch_quote_chunk", fake_chunk)
+
+    async def main():
+        return idx.fetch_quotes(["A", "B"])
+
+    assert set(asyncio.run(main())) == {"A", "B"}
+
+
+def test_update_prices_skips_fresh_and_retries_failed(idx, monkeypatch):
+    fetched = []
+    monkeypatch.setattr(idx.IndexPortfolio, "_download_prices",
+                        lambda self, symbols, chunk_size=20: fetched.extend(symbols))
+    portfolio = idx.IndexPortfolio()
+    portfolio.set_price("FRESH", 10.0)
+    portfolio.get_slots(["FAILED"])  # registered but never priced (_px_time == 0)
+
+    portfolio.update_prices(["FRESH", "FAILED", "NEW"])
+    assert fetched == ["FAILED", "NEW"]
+
+    fetched.clear()
+    portfolio.update_prices(["FRESH"], max_age=0)
+    assert fetched == ["FRESH"]
+
+
+def test_rebalance_fetches_prices_once(idx, monkeypatch):
+    calls = []
+
+    def fake_update_prices(self, symbols=None, **kwargs):
+        calls.append(list(symbols))
+        for symbol in symbols:
+            self.set_price(symbol, 10.0)
+
+    monkeypatch.setattr(idx.IndexPortfolio, "update_prices", fake_update_prices)
+    monkeypatch.setattr(idx, "get_index_composition",
+                        lambda index_symbol: {"symbols": ["A", "B"], "weights": {"A": 0.5, "B": 0.5}})
+    monkeypatch.setattr(idx.BrokerInterface, "place_order", lambda self, *order: True)
+
+    investor = idx.IndexInvestor("^GSPC", idx.BrokerInterface(), initial_cash=1000)
+    investor.rebalance()
+
+    assert calls == [["A", "B"]]
+    assert investor.portfolio.holdings == {"A": 50, "B": 50}
+
+
+def test_holdings_are_whole_shares(idx):
+    portfolio = idx.IndexPortfolio()
+    portfolio.adjust_holding("A", 50)
+    assert portfolio.holdings == {"A": 50}
+    assert type(portfolio.holdings["A"]) is int